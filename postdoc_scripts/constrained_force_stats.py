@@ -1,35 +1,91 @@
+import io
 import os
+import re
+import mmap
 import numpy as np
 import matplotlib.pyplot as plt
-from glob import glob
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 def get_file_line_count(filename):
-    with open(filename) as f:
-        for i, l in enumerate(f):
-            pass
-    return i + 1
+    line_count = 0
+    last_chunk = b''
+    # Count newlines on raw 1 MiB chunks instead of iterating line by line in Python
+    with open(filename, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            line_count += chunk.count(b'\n')
+            last_chunk = chunk
+    # Account for a final line that is not newline-terminated
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        line_count += 1
+    return line_count
+
+# REPORT line tags of interest
+LAMBDA_TAG = b'b_m'
+CV_TAG = b'cc>'
+MD_STEP_TAG = b'MD step No.'
+
+# Segment folders written by the segmented submit scripts (seg01, seg02, ...)
+SEGMENT_FOLDER_PATTERN = re.compile(r'seg(\d+)')
+
+def find_tagged_lines(mm, tag, end):
+    """
+    Yields the span of every line containing the tag, starting at the tag itself.
+
+    Args:
+    - mm: Memory-mapped REPORT file.
+    - tag: Byte string marking the lines of interest.
+    - end: Offset at which to stop searching.
+
+    Returns:
+    - Generator of (start, end_of_line) offsets.
+    """
+    start = mm.find(tag, 0, end)
+    while start != -1:
+        end_of_line = mm.find(b'\n', start, end)
+        if end_of_line == -1:
+            end_of_line = end
+        yield start, end_of_line
+        start = mm.find(tag, end_of_line, end)
 
 # Modified function to include max_steps parameter
-def read_simulation_data(folder_name, max_steps=None):
-    lambda_values = []
+def read_simulation_data(folder_name, max_steps=None, constraint_index=0, num_constraints=1):
+    lambda_values = np.empty(0)
     force_values_on_constrained_bond = []
     md_steps = 0
-    
-    with open(f'./{folder_name}/REPORT') as file:
-        for line in file:
-            if "b_m" in line:
-                lambda_values.append(float(line.split()[1]))
-            if "cc>" in line:
-                try:
-                    force_values_on_constrained_bond.append(float(line.split()[2]))
-                except ValueError:
-                    print('Error parsing collective variable value')
-            if "MD step No." in line:
+
+    with open(f'./{folder_name}/REPORT', 'rb') as file:
+        # mmap cannot map an empty file
+        if os.fstat(file.fileno()).st_size == 0:
+            return lambda_values, force_values_on_constrained_bond, md_steps
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Count MD steps, stopping the scan at the header of step max_steps if requested
+            end = len(mm)
+            start = mm.find(MD_STEP_TAG)
+            while start != -1:
                 md_steps += 1
-                # Break the loop if the number of steps reaches max_steps
                 if max_steps is not None and md_steps >= max_steps:
+                    end = start
                     break
-    
+                start = mm.find(MD_STEP_TAG, start + len(MD_STEP_TAG))
+
+            # Only the matching lines are sliced out of the map and split. Each MD step writes one
+            # b_m and one cc> line per constraint, so only every num_constraints-th line is parsed
+            lambda_lines = find_tagged_lines(mm, LAMBDA_TAG, end)
+            selected_lambda_lines = [mm[start:end_of_line] for start, end_of_line in
+                                     islice(lambda_lines, constraint_index, None, num_constraints)]
+            # Convert all selected lambda fields in one loadtxt call instead of a split() and float() per line
+            if selected_lambda_lines:
+                lambda_values = np.loadtxt(io.BytesIO(b'\n'.join(selected_lambda_lines)), usecols=1, ndmin=1)
+            cv_lines = find_tagged_lines(mm, CV_TAG, end)
+            for start, end_of_line in islice(cv_lines, constraint_index, None, num_constraints):
+                try:
+                    force_values_on_constrained_bond.append(float(mm[start:end_of_line].split()[2]))
+                except ValueError:
+                    print('Error parsing collective variable value')
+
     return lambda_values, force_values_on_constrained_bond, md_steps
 
 def calculate_statistics(lambda_values_per_cv):
@@ -37,17 +93,21 @@ def calculate_statistics(lambda_values_per_cv):
     standard_deviation = np.std(lambda_values_per_cv)
     return mean_force, standard_deviation
 
-def cumulative_force_analysis(force_values):
-    cumulative_means = []
-    cumulative_stds = []
-    cumulative_intervals = []
+def cumulative_force_analysis(force_values, interval=500):
+    values = np.asarray(force_values, dtype=np.float64)
+    cumulative_intervals = np.arange(interval, len(values) + 1, interval)
+    if cumulative_intervals.size == 0:
+        return cumulative_intervals, np.empty(0), np.empty(0)
 
-    total_number = len(force_values)
-    if total_number >= 500:
-        for i in range(500, total_number + 1, 500):
-            cumulative_intervals.append(i)
-            cumulative_means.append(np.mean(force_values[:i]))
-            cumulative_stds.append(np.std(force_values[:i]))
+    # Running sums evaluated only at the sampled intervals; shifting by the first value
+    # keeps E[x^2] - E[x]^2 from losing precision when the mean is large relative to the spread
+    shifted_values = values - values[0]
+    cumulative_sums = np.cumsum(shifted_values)[cumulative_intervals - 1]
+    cumulative_square_sums = np.cumsum(shifted_values * shifted_values)[cumulative_intervals - 1]
+
+    shifted_means = cumulative_sums / cumulative_intervals
+    cumulative_means = shifted_means + values[0]
+    cumulative_stds = np.sqrt(np.maximum(cumulative_square_sums / cumulative_intervals - shifted_means**2, 0.0))
 
     return cumulative_intervals, cumulative_means, cumulative_stds
 
@@ -57,31 +117,34 @@ def main():
     total_md_steps = 0  # Initialize total MD steps accumulator
     max_steps = None  # Specify the maximum number of steps to consider for analysis
 
-    with open("INCAR", "r") as file:
-        time_step = float(next((line.split('=')[1].strip() for line in file if "POTIM" in line), None))
-
-    folders = sorted(glob('seg*'))
+    # Order the segment folders numerically from a single directory scan
+    segments = [(int(match.group(1)), entry.name) for entry in os.scandir('.')
+                if entry.is_dir() and (match := SEGMENT_FOLDER_PATTERN.fullmatch(entry.name))]
+    folders = [folder for _, folder in sorted(segments)]
     if len(folders) == 0:  # Check if there are any folders to analyze
         print('No folders found for analysis')
         exit()
     
-    all_lambda_values = []
-    all_cv_values = []
+    lambda_values_per_cv = []
+    cv_values_per_constraint = []
     
-    for folder in folders:
-        if os.path.exists(f'./{folder}/REPORT'):
-            lambda_values, cv_values, md_steps = read_simulation_data(folder, max_steps=max_steps)
-            all_lambda_values.extend(lambda_values)
-            all_cv_values.extend(cv_values)
+    # Segments are independent, so parse them in parallel; map keeps the results in folder order
+    folders = [folder for folder in folders if os.path.exists(f'./{folder}/REPORT')]
+    chunksize = max(1, len(folders) // (4 * (os.cpu_count() or 1)))
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(partial(read_simulation_data, max_steps=max_steps, constraint_index=constraint_index,
+                                       num_constraints=num_constraints), folders, chunksize=chunksize)
+        for lambda_values, cv_values, md_steps in results:
+            lambda_values_per_cv.extend(lambda_values)
+            cv_values_per_constraint.extend(cv_values)
             total_md_steps += md_steps  # Accumulate total MD steps here
     
-    lambda_values_per_cv = all_lambda_values[constraint_index::num_constraints]
     mean_force, std_dev = calculate_statistics(lambda_values_per_cv)
     cumulative_intervals, cumulative_means, cumulative_stds = cumulative_force_analysis(lambda_values_per_cv)
     
     with open('force_stats_report.txt', 'w') as output_file:
         output_file.write(f'Integrating over Reaction Coordinate Index: {constraint_index}, with a total of {num_constraints} constraints\n')
-        output_file.write(f'CV: {all_cv_values[0]:.2f}\n')
+        output_file.write(f'CV: {cv_values_per_constraint[0]:.2f}\n')
         output_file.write(f'Mean Force: {mean_force:.2f}\n')
         output_file.write(f'Standard Deviation: {std_dev:.2f}\n')
         output_file.write(f'MD steps: {total_md_steps}\n')
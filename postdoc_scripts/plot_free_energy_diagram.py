@@ -1,7 +1,7 @@
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
+import math
 import numpy as np
-import sympy as sp
 
 # Define font sizes and tick parameters as constants
 LABEL_FONTSIZE = 18
@@ -12,19 +12,24 @@ TICK_LENGTH_MAJOR = 8
 TICK_WIDTH_MAJOR = 1
 
 def find_coefficients(x1, y1, x2, y2, ymax):
-    # Define the variables
-    a, b, c = sp.symbols('a b c')
-    
-    # Define the equations
-    eq1 = sp.Eq(y1, a*x1**2 + b*x1 + c)
-    eq2 = sp.Eq(y2, a*x2**2 + b*x2 + c)
-    eq3 = sp.Eq(c, ymax + b**2/(4*a))
-    
-    # Solve the system of equations
-    solution = sp.solve((eq1, eq2, eq3), (a, b, c))
-    
-    # Return the solutions
-    return solution
+    # Write the parabola in vertex form y = a*(x - xv)**2 + ymax. Both endpoints lie below the
+    # vertex, so |x1 - xv| / sqrt(ymax - y1) = |x2 - xv| / sqrt(ymax - y2), which gives xv in closed form
+    if ymax <= y1 or ymax <= y2:
+        return []
+    s1 = math.sqrt(ymax - y1)
+    s2 = math.sqrt(ymax - y2)
+
+    # Vertex between the endpoints, and (unless the endpoints are level) the one outside them
+    vertex_positions = [(x1 * s2 + x2 * s1) / (s1 + s2)]
+    if s1 != s2:
+        vertex_positions.append((x1 * s2 - x2 * s1) / (s2 - s1))
+
+    # Expand each vertex form into the coefficients of a*x**2 + b*x + c
+    solutions = []
+    for xv in vertex_positions:
+        a = -(s1 / (x1 - xv))**2
+        solutions.append((a, -2 * a * xv, a * xv**2 + ymax))
+    return solutions
 
 def find_valid_coefficients(x1, y1, x2, y2, ymax):
     solutions = find_coefficients(x1, y1, x2, y2, ymax)
@@ -109,7 +114,7 @@ for i, (start, end) in enumerate(transitions):
         barrier_pos = -b / (2 * a)
 
         x = np.linspace(start_pos + width, end_pos - width, 100)
-        y = a * x**2 + b * x + c
+        y = (a * x + b) * x + c  # Horner form saves a multiply and the x**2 temporary
 
         ax.plot(x, y, 'gray', linestyle='--')
         ax.scatter([barrier_pos], [barrier_energy], color=colors[i])
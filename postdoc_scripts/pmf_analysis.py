@@ -1,11 +1,9 @@
 import os
 import glob
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.patches import Polygon
 from scipy.interpolate import interp1d
-from scipy.integrate import trapz
 
 # Define font sizes and tick parameters as constants
 LABEL_FONTSIZE = 18
@@ -15,6 +13,17 @@ LEGEND_FONTSIZE = 14
 TICK_LENGTH_MAJOR = 8
 TICK_WIDTH_MAJOR = 1
 
+# Per-window force statistics collected from force_stats_report.txt files
+FORCE_STATS_DTYPE = [('bond_length', 'f8'), ('mean_force', 'f8'), ('std_dev', 'f8'), ('md_steps', 'i8')]
+
+# Field, header and format of each column in the printed table
+TABLE_COLUMNS = [
+    ('bond_length', 'Constrained_Bond_Length (Å)', '.2f'),
+    ('mean_force', 'Mean_Force (eV/Å)', '.2f'),
+    ('std_dev', 'Standard_Deviation (eV/Å)', '.2f'),
+    ('md_steps', 'MD_Steps', 'd'),
+]
+
 # This function reads the force_stats_report.txt and extracts the values
 def read_force_stats(file_path, target_steps=None):
     with open(file_path, 'r') as file:
@@ -97,13 +106,14 @@ def compute_barriers_and_states(fine_x, fine_y, interp_func, roots):
 
     if len(roots) == 1:
         root = roots[0]
-        root_index = np.argmin(np.abs(fine_x - root))
+        # Roots are taken from fine_x itself, so a binary search on the sorted grid recovers their indices
+        root_index = np.searchsorted(fine_x, root)
         slope = compute_slope(interp_func, root)
 
         if slope > 0:
             state_types = ["Transition State"]
-            forward_barrier = abs(trapz(fine_y[:root_index + 1], fine_x[:root_index + 1]))
-            reverse_barrier = abs(trapz(fine_y[root_index:], fine_x[root_index:]))
+            forward_barrier = abs(np.trapezoid(fine_y[:root_index + 1], fine_x[:root_index + 1]))
+            reverse_barrier = abs(np.trapezoid(fine_y[root_index:], fine_x[root_index:]))
         else:
             # Check if it is initial or final state
             points_after = len(fine_x[fine_x > root])
@@ -111,29 +121,29 @@ def compute_barriers_and_states(fine_x, fine_y, interp_func, roots):
             MIN_POINTS_TO_DETERMINE_STATE = 3
             if points_after >= MIN_POINTS_TO_DETERMINE_STATE:
                 state_types = ["Initial State"]
-                forward_barrier = abs(trapz(fine_y[root_index:], fine_x[root_index:]))
+                forward_barrier = abs(np.trapezoid(fine_y[root_index:], fine_x[root_index:]))
             elif points_before >= MIN_POINTS_TO_DETERMINE_STATE:
                 state_types = ["Final State"]
-                reverse_barrier = abs(trapz(fine_y[:root_index], fine_x[:root_index]))
+                reverse_barrier = abs(np.trapezoid(fine_y[:root_index], fine_x[:root_index]))
     elif len(roots) == 2:
-        root_index1 = np.argmin(np.abs(fine_x - roots[0]))
-        root_index2 = np.argmin(np.abs(fine_x - roots[1]))
+        root_index1 = np.searchsorted(fine_x, roots[0])
+        root_index2 = np.searchsorted(fine_x, roots[1])
         slope1 = compute_slope(interp_func, roots[0])
         slope2 = compute_slope(interp_func, roots[1])
 
         if slope1 < 0 and slope2 > 0:
             state_types = ["Initial State", "Transition State"]
-            forward_barrier = abs(trapz(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
+            forward_barrier = abs(np.trapezoid(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
         elif slope1 > 0 and slope2 < 0:
             state_types = ["Transition State", "Final State"]
-            reverse_barrier = abs(trapz(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
+            reverse_barrier = abs(np.trapezoid(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
     elif len(roots) == 3:
-        root_index1 = np.argmin(np.abs(fine_x - roots[0]))
-        root_index2 = np.argmin(np.abs(fine_x - roots[1]))
-        root_index3 = np.argmin(np.abs(fine_x - roots[2]))
+        root_index1 = np.searchsorted(fine_x, roots[0])
+        root_index2 = np.searchsorted(fine_x, roots[1])
+        root_index3 = np.searchsorted(fine_x, roots[2])
         state_types = ["Initial State", "Transition State", "Final State"]
-        forward_barrier = abs(trapz(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
-        reverse_barrier = abs(trapz(fine_y[root_index2:root_index3 + 1], fine_x[root_index2:root_index3 + 1]))
+        forward_barrier = abs(np.trapezoid(fine_y[root_index1:root_index2 + 1], fine_x[root_index1:root_index2 + 1]))
+        reverse_barrier = abs(np.trapezoid(fine_y[root_index2:root_index3 + 1], fine_x[root_index2:root_index3 + 1]))
 
     free_energy_change = forward_barrier + reverse_barrier
 
@@ -165,17 +175,32 @@ def calculate_barriers(x, y):
     return results, fine_x, fine_y
 
 def process_data(target_steps=None):
-    data = {'Constrained_Bond_Length (Å)': [], 'Mean_Force (eV/Å)': [], 'Standard_Deviation (eV/Å)': [], 'MD_Steps': []}
+    records = []
     for folder in glob.glob("[0-9].[0-9][0-9]_*"):
         file_path = os.path.join(folder, 'force_stats_report.txt')
         if os.path.isfile(file_path):
             stats = read_force_stats(file_path, target_steps=target_steps)
-            data['Constrained_Bond_Length (Å)'].append(stats['CV'])
-            data['Mean_Force (eV/Å)'].append(stats['Mean Force'])
-            data['Standard_Deviation (eV/Å)'].append(stats['Standard Deviation'])
-            data['MD_Steps'].append(stats['MD steps'])
-    df = pd.DataFrame(data).sort_values(by=['Constrained_Bond_Length (Å)'])
-    return df
+            records.append((stats['CV'], stats['Mean Force'], stats['Standard Deviation'], stats['MD steps']))
+    data = np.array(records, dtype=FORCE_STATS_DTYPE)
+    data.sort(order='bond_length')
+    return data
+
+def format_table(data):
+    """
+    Formats the force statistics as a right-aligned text table.
+
+    Args:
+    - data: Structured array with the fields of FORCE_STATS_DTYPE.
+
+    Returns:
+    - str: The table with one header row and one row per constrained bond length.
+    """
+    columns = []
+    for field, header, value_format in TABLE_COLUMNS:
+        cells = [header] + [f"{value:{value_format}}" for value in data[field]]
+        width = max(len(cell) for cell in cells)
+        columns.append([cell.rjust(width + 1) for cell in cells])
+    return '\n'.join(' '.join(row) for row in zip(*columns))
 
 def analyze_barriers(x, y, std_dev):
     results, fine_x, fine_y = calculate_barriers(x, y)
@@ -215,7 +240,7 @@ def plot_data(x, y, std_dev, fine_x=None, fine_y=None, plot_interpolated_curve=T
         plt.legend(fontsize=LEGEND_FONTSIZE)
 
     # Fill the area under the curve
-    verts = [(x[0], 0)] + list(zip(x, y)) + [(x[-1], 0)]
+    verts = np.vstack([[x[0], 0], np.column_stack([x, y]), [x[-1], 0]])
     poly = Polygon(verts, facecolor='0.9', edgecolor='0.1')
     ax.add_patch(poly)
 
@@ -229,16 +254,16 @@ def plot_data(x, y, std_dev, fine_x=None, fine_y=None, plot_interpolated_curve=T
 def main():
     # target_steps=None will use the data until the last step of the simulation.
     # target_steps=np.arange(500, 10500, 500) will use the specified steps.
-    df = process_data(target_steps=None)
-    x = df['Constrained_Bond_Length (Å)'].to_numpy()
-    y = df['Mean_Force (eV/Å)'].to_numpy()
-    std_dev = df['Standard_Deviation (eV/Å)'].to_numpy()
+    data = process_data(target_steps=None)
+    x = data['bond_length']
+    y = data['mean_force']
+    std_dev = data['std_dev']
 
     results, forward_barrier_std, reverse_barrier_std, fine_x, fine_y = analyze_barriers(x, y, std_dev)
     results_string = format_results(results, forward_barrier_std, reverse_barrier_std)
 
     # Print data in a table format and save it to a text file
-    table_string = df.to_string(index=False)
+    table_string = format_table(data)
     print(table_string + '\n')
     print(results_string)
     with open("pmf_analysis_results.txt", "w") as text_file:
@@ -1,92 +1,160 @@
 import numpy as np
 import os
 import matplotlib.pyplot as plt
-from ase.io import read, write
+from ase import Atoms
+from ase.io import write
+
+def read_xdatcar_header(file):
+    """
+    Read the lattice and chemical symbols from an XDATCAR header, after its comment line.
+
+    Parameters:
+    file (file object): Open XDATCAR file positioned just after the comment line.
+    """
+    scale = float(file.readline().split()[0])
+    lattice = np.array([file.readline().split()[:3] for _ in range(3)], dtype=float) * scale
+    species = file.readline().split()
+    counts = [int(count) for count in file.readline().split()]
+    symbols = [symbol for symbol, count in zip(species, counts) for _ in range(count)]
+    return lattice, symbols
+
+def iterate_xdatcar_frames(filename):
+    """
+    Yield the lattice, chemical symbols and raw coordinate lines of each XDATCAR frame without building Atoms objects.
+
+    Parameters:
+    filename (str): Path to the XDATCAR file.
+    """
+    with open(filename) as file:
+        file.readline()  # Comment line
+        lattice, symbols = read_xdatcar_header(file)
+        for line in file:
+            if not line.strip():
+                break
+            # Variable-cell runs repeat the header before every configuration
+            if 'configuration' not in line:
+                lattice, symbols = read_xdatcar_header(file)
+                file.readline()  # Configuration line
+            coordinate_lines = [file.readline() for _ in range(len(symbols))]
+            yield lattice, symbols, coordinate_lines
+
+def read_xdatcar_positions(filename, atom_indices):
+    """
+    Read the fractional coordinates of selected atoms and the lattice of every XDATCAR frame.
+
+    Parameters:
+    filename (str): Path to the XDATCAR file.
+    atom_indices (list): Indices of the atoms to keep.
+    """
+    scaled_positions = []
+    cells = []
+    for lattice, _, coordinate_lines in iterate_xdatcar_frames(filename):
+        scaled_positions.append([coordinate_lines[atom_index].split()[:3] for atom_index in atom_indices])
+        cells.append(lattice)
+    return np.array(scaled_positions, dtype=float), np.array(cells)
+
+def read_xdatcar_frames(filename, frame_indices):
+    """
+    Build atomic configurations for the requested XDATCAR frames only.
+
+    Parameters:
+    filename (str): Path to the XDATCAR file.
+    frame_indices (list): Indices of the frames to build.
+    """
+    frame_indices = set(frame_indices)
+    frames = {}
+    for frame_index, (lattice, symbols, coordinate_lines) in enumerate(iterate_xdatcar_frames(filename)):
+        if frame_index in frame_indices:
+            coordinates = np.array([line.split()[:3] for line in coordinate_lines], dtype=float)
+            frames[frame_index] = Atoms(symbols, scaled_positions=coordinates, cell=lattice, pbc=True)
+    return frames
 
 def compute_distance(coord1, coord2, lattice):
-    diff = np.dot(lattice, coord1 - coord2)
-    return np.linalg.norm(diff)
+    """
+    Compute minimum-image distances between batches of fractional coordinates.
+
+    Parameters:
+    coord1 (np.ndarray): Fractional coordinates of the first atom, shape (nframes, 3).
+    coord2 (np.ndarray): Fractional coordinates of the second atom, shape (nframes, 3).
+    lattice (np.ndarray): Lattice vectors as rows, shape (3, 3) or (nframes, 3, 3).
+    """
+    diff = coord1 - coord2
+    # Minimum image convention in fractional space; reliable for bonded atoms, but in skewed cells
+    # separations comparable to the cell size may not resolve to the nearest image
+    diff -= np.round(diff)
+    return np.linalg.norm(np.einsum('...i,...ij->...j', diff, lattice), axis=-1)
 
-def calculate_atom_distances(trajectory, atom1_index, atom2_index):
+def calculate_atom_distances(scaled_positions, cells, atom1_index, atom2_index):
     """
     Calculate distances between two specified atoms across all frames in a trajectory.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
+    scaled_positions (np.ndarray): Fractional coordinates of the atoms, shape (nframes, natoms, 3).
+    cells (np.ndarray): Lattice vectors of every frame, shape (nframes, 3, 3).
     atom1_index (int): Index of the first atom.
     atom2_index (int): Index of the second atom.
     """        
-    return [frame.get_distance(atom1_index, atom2_index, mic=True) for frame in trajectory]
+    return compute_distance(scaled_positions[:, atom1_index], scaled_positions[:, atom2_index], cells)
 
-def find_frames_within_distance_range(trajectory, atom1_index, atom2_index, target_length, tolerance):
+def find_frames_within_distance_range(distances, target_length, tolerance):
     """
     Find frames with bond length between two specified atoms within the specified range.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
-    atom1_index (int): Index of the first atom.
-    atom2_index (int): Index of the second atom.
+    distances (np.ndarray): Precomputed distances between the two atoms for every frame.
     target_distance (float): Target bond length between the two atoms.
     tolerance (float): Tolerance for matching the bond lengths.
     """
-    close_frames = [i for i, frame in enumerate(trajectory) 
-                    if abs(frame.get_distance(atom1_index, atom2_index, mic=True) - target_length) < tolerance]
-    return close_frames
+    return np.nonzero(np.abs(distances - target_length) < tolerance)[0]
 
-def find_target_frames_between_two_atoms(trajectory, target_bond_lengths, atom1_index, atom2_index, initial_tolerance, secondary_tolerance):
+def find_target_frames_between_two_atoms(distances, target_bond_lengths, initial_tolerance, secondary_tolerance):
     """
     Find frames where the bond length between the pair of atoms is within the specified range.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
+    distances (np.ndarray): Precomputed distances between the pair of atoms for every frame.
     target_bond_lengths (list): Target bond lengths between the first pair of atoms to match.
-    atom1_index (int): Index of the first atom.
-    atom2_index (int): Index of the second atom.
     initial_tolerance (float): Initial tolerance for matching the bond lengths.
     secondary_tolerance (float): Secondary tolerance for matching the bond lengths.
     """
     target_frames = []
     for target_length in target_bond_lengths:
-        frames_within_range = find_frames_within_distance_range(trajectory, atom1_index, atom2_index, target_length, initial_tolerance)
+        frames_within_range = find_frames_within_distance_range(distances, target_length, initial_tolerance)
 
         # If no frame is found with initial tolerance, try with secondary tolerance
-        if not frames_within_range:
-            frames_within_range = find_frames_within_distance_range(trajectory, atom1_index, atom2_index, target_length, secondary_tolerance)
+        if frames_within_range.size == 0:
+            frames_within_range = find_frames_within_distance_range(distances, target_length, secondary_tolerance)
 
-        if frames_within_range:
-            frame_with_min_bond = frames_within_range[np.argmin([trajectory[i].get_distance(atom1_index, atom2_index, mic=True) for i in frames_within_range])]
-            bond_distance = trajectory[frame_with_min_bond].get_distance(atom1_index, atom2_index, mic=True)
-            target_frames.append((frame_with_min_bond, bond_distance))
+        if frames_within_range.size:
+            frame_with_min_bond = frames_within_range[np.argmin(distances[frames_within_range])]
+            target_frames.append((frame_with_min_bond, distances[frame_with_min_bond]))
         else:
             print(f"No frame found for target bond length: {target_length:.2f} Å.")
 
     return target_frames
 
-def find_target_frames_with_third_atom(trajectory, target_bond_lengths, atom1_index, atom2_index, atom3_index, initial_tolerance, secondary_tolerance):
+def find_target_frames_with_third_atom(primary_distances, secondary_distances, target_bond_lengths, initial_tolerance, secondary_tolerance):
     """
     Find frames where the bond length between the first pair of atoms is within the specified range and has minimum bond length with a third atom.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
+    primary_distances (np.ndarray): Precomputed distances between the first and second atoms for every frame.
+    secondary_distances (np.ndarray): Precomputed distances between the first and third atoms for every frame.
     target_bond_lengths (list): Target bond lengths between the first pair of atoms to match.
-    atom1_index (int): Index of the first atom in the primary bond.
-    atom2_index (int): Index of the second atom in the primary bond.
-    atom3_index (int): Index of the third atom to compare with the first atom.
     initial_tolerance (float): Initial tolerance for matching the primary bond lengths.
     secondary_tolerance (float): Secondary tolerance for matching the primary bond lengths.
     """
     target_frames = []
     for target_length in target_bond_lengths:
-        frames_within_range = find_frames_within_distance_range(trajectory, atom1_index, atom2_index, target_length, initial_tolerance)
+        frames_within_range = find_frames_within_distance_range(primary_distances, target_length, initial_tolerance)
 
         # If no frame is found with initial tolerance, try with secondary tolerance
-        if not frames_within_range:
-            frames_within_range = find_frames_within_distance_range(trajectory, atom1_index, atom2_index, target_length, secondary_tolerance)
+        if frames_within_range.size == 0:
+            frames_within_range = find_frames_within_distance_range(primary_distances, target_length, secondary_tolerance)
 
-        if frames_within_range:
-            frame_with_min_bond = frames_within_range[np.argmin([trajectory[i].get_distance(atom1_index, atom3_index, mic=True) for i in frames_within_range])]
-            primary_bond_distance = trajectory[frame_with_min_bond].get_distance(atom1_index, atom2_index, mic=True)
-            target_frames.append((frame_with_min_bond, primary_bond_distance))
+        if frames_within_range.size:
+            frame_with_min_bond = frames_within_range[np.argmin(secondary_distances[frames_within_range])]
+            target_frames.append((frame_with_min_bond, primary_distances[frame_with_min_bond]))
         else:
             print(f"No frame found for target bond length: {target_length:.2f} Å.")
 
@@ -97,7 +165,7 @@ def create_poscar_directories(trajectory, frame_data, base_dir):
     Create directories and write POSCAR files for specified frames.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
+    trajectory (dict or list): Atomic configurations indexed by frame.
     frame_data (list of tuples): Tuples of frame indices and corresponding C-H bond lengths.
     base_dir (str): Base directory to create frame directories.
     """
@@ -107,20 +175,15 @@ def create_poscar_directories(trajectory, frame_data, base_dir):
         os.makedirs(dir_name, exist_ok=True)
         write(f'{dir_name}/POSCAR', trajectory[frame_index], format='vasp')  # Use ASE to write the POSCAR file
 
-def plot_atom_distances(trajectory, atom1_index, atom2_index, figname='atom_distance_plot.png', show_plot=True):
+def plot_atom_distances(atom_distances, figname='atom_distance_plot.png', show_plot=True):
     """
     Plot and optionally save the bond distance between two specified atoms against the frame index.
 
     Parameters:
-    trajectory (list): List of atomic configurations.
-    atom1_index (int): Index of the first atom.
-    atom2_index (int): Index of the second atom.
+    atom_distances (np.ndarray): Precomputed distances between the two atoms for every frame.
     figname (str): The filename to save the plot.
     show_plot (bool): If True, display the plot; if False, don't display.
     """
-    # Calculate C-H distances
-    atom_distances = calculate_atom_distances(trajectory, atom1_index, atom2_index)
-
     # Extract frame indices
     frame_indices = np.arange(len(atom_distances))
 
@@ -151,18 +214,21 @@ def main():
     # Secondary tolerance level to use if no frame is found within the initial tolerance
     secondary_tolerance = 0.02
 
-    # Read trajectory
-    trajectory = read("XDATCAR", index=':', format='vasp-xdatcar')
+    # Read only the coordinates of the atoms of interest (in C, H, Pt order) and the cell of every frame
+    scaled_positions, cells = read_xdatcar_positions("XDATCAR", [C_index, H_index, Pt_index])
+    C_H_distances = calculate_atom_distances(scaled_positions, cells, 0, 1)
+    C_Pt_distances = calculate_atom_distances(scaled_positions, cells, 0, 2)
 
     # Find target frames
     C_H_targets = np.linspace(C_H_start, C_H_end, num_images, endpoint=True)
-    target_frames = find_target_frames_with_third_atom(trajectory, C_H_targets, C_index, H_index, Pt_index, initial_tolerance, secondary_tolerance)
+    target_frames = find_target_frames_with_third_atom(C_H_distances, C_Pt_distances, C_H_targets, initial_tolerance, secondary_tolerance)
 
-    # Create directories and write POSCAR
+    # Build only the selected frames, then create directories and write POSCAR
+    trajectory = read_xdatcar_frames("XDATCAR", [frame_index for frame_index, _ in target_frames])
     create_poscar_directories(trajectory, target_frames, os.getcwd())
 
     # Plot distances
-    plot_atom_distances(trajectory, C_index, H_index, figname='C-H_distance_plot.png', show_plot=False)
+    plot_atom_distances(C_H_distances, figname='C-H_distance_plot.png', show_plot=False)
 
 if __name__ == "__main__":
     main()